@@ -1,7 +1,6 @@
 import os
 import time
 import json
-import pandas as pd
 import pytz
 import holidays
 import logging
@@ -40,7 +39,7 @@ def create_bot_from_config_id(bot_id):
 
 def market_is_open():
     """Check if market is open using NYSE hours and holidays"""
-    now = pd.Timestamp.now(tz=nyse)
+    now = datetime.now(tz=nyse)
     if now.date() in holidays.NYSE():
         return False
     if now.weekday() >= 5:  # Saturday(5) or Sunday(6)
@@ -52,7 +51,11 @@ def market_is_open():
 def run_bot(bot, logger, check_interval):
     """Run a single bot's trading logic"""
     logger.info(f"Starting bot for {bot.symbol}")
-    logger.info(f"💰 Initial equity: ${bot.get_current_equity():.2f}")
+    try:
+        logger.info(f"💰 Initial equity: ${bot.get_current_equity():.2f}")
+    except Exception as e:
+        # Alpaca being unreachable must not kill the bot before its first cycle - run() retries the lookup
+        logger.info(f"Could not fetch initial equity for {bot.symbol}: {str(e)}")
     
     trading_active = True
     
@@ -89,7 +92,7 @@ def run_bot(bot, logger, check_interval):
     # Clean up at end of day
     bot.close_position()
     
-    logger.info(f"Trading day complete for {bot.symbol} at {pd.Timestamp.now(tz=nyse)}")
+    logger.info(f"Trading day complete for {bot.symbol} at {datetime.now(tz=nyse)}")
     final_pnl = bot.calculate_pnl()
     logger.info(f"Daily P&L for {bot.symbol}: {final_pnl*100:.2f}%")
 
@@ -107,7 +110,7 @@ def run_multiple_bots(config=None):
     if config is None:
         config = load_config(logger)
     
-    logger.info(f"Bling Bot system starting at {pd.Timestamp.now(tz=nyse)}")
+    logger.info(f"Bling Bot system starting at {datetime.now(tz=nyse)}")
     logger.info(f"Found {len(bot_ids)} bot IDs: {bot_ids}")
     
     # Create all bots from configuration using IDs
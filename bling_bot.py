@@ -1,18 +1,61 @@
 import os
+import math
+import time
 import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from alpaca.common.exceptions import APIError
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import MarketOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
 from config_manager import ConfigManager
 
+# Alpaca credentials, resolved once at import rather than per bot
+_ALPACA_KEY = os.getenv('ALPACA_API_KEY') or os.getenv('ALPACA_KEY')
+_ALPACA_SECRET = os.getenv('ALPACA_API_SECRET') or os.getenv('ALPACA_SECRET')
+
+# Alpaca allows 200 requests per minute per account
+ALPACA_MIN_INTERVAL = 60.0 / 200
+
+# (connect, read) timeout in seconds for Alpaca requests, so a hung socket can't stall a cycle
+ALPACA_TIMEOUT = (2, 10)
+
+class _TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to requests made without one"""
+    
+    def __init__(self, *args, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(*args, **kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
 class BlingBot:
     """
     Trading bot that uses pluggable trading algorithms for signal generation and Alpaca for trade execution.
     Uses per-symbol value tracking: starts with initial_value, updates based on position market value.
     """
     
+    __slots__ = ('logger', 'symbol', 'bot_id', 'interval_minutes', '_interval_seconds', 'initial_value',
+                 '_inv_init', 'current_value', 'paper', 'session', 'signal_timespan', 'signal_multiplier',
+                 'signal_days_back', 'daily_pnl_threshold', 'daily_gain_target', 'last_signal_time',
+                 '_last_signal_mono', 'cached_signal', 'current_position', '_position_cache', '_position_cache_valid',
+                 '_io_pool', '_buy_order_kwargs', 'config_manager', 'algo', 'api_key', 'api_secret', 'trading_client')
+    
+    # Signals that never lead to a trade
+    _NO_TRADE_SIGNALS = frozenset({'ERROR', 'NONE'})
+    
+    # Earliest time the next Alpaca request may go out, shared by all bots since they trade one account
+    _alpaca_lock = threading.Lock()
+    _alpaca_next_ok = 0.0
+    
     @classmethod
     def from_config_id(cls, bot_id: int, config_path: str = None):
         """
@@ -29,7 +72,6 @@ class BlingBot:
             raise ValueError(f"Bot with ID {bot_id} not found in config")
         
         # Import algorithm class
-        from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
         from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
         
         # Create algorithm instance
@@ -61,7 +103,7 @@ class BlingBot:
     
     def __init__(self, symbol, interval_minutes=5, initial_value=1000, paper=True, algorithm=None, 
                  signal_timespan='minute', signal_multiplier=5, signal_days_back=3,
-                 daily_pnl_threshold=-0.05, daily_gain_target=0.10, bot_id=None):
+                 daily_pnl_threshold=-0.05, daily_gain_target=0.10, bot_id=None, session=None):
         """
         Initialize the trading bot.
         
@@ -76,6 +118,7 @@ class BlingBot:
         :param daily_pnl_threshold: Daily loss limit (negative value, e.g., -0.05 for -5%)
         :param daily_gain_target: Daily gain target (positive value, e.g., 0.10 for 10%)
         :param bot_id: Bot ID from config.json (optional, used for persistence)
+        :param session: requests.Session to share with other bots for Alpaca calls (optional)
         """
         # Configure logging
         self.logger = logging.getLogger(__name__)
@@ -89,9 +132,12 @@ class BlingBot:
         self.symbol = symbol
         self.bot_id = bot_id
         self.interval_minutes = interval_minutes
+        self._interval_seconds = interval_minutes * 60
         self.initial_value = initial_value
+        self._inv_init = 1.0 / float(initial_value) if initial_value else 0.0  # Avoids a division per P&L check
         self.current_value = initial_value
         self.paper = paper
+        self.session = session
         
         # Signal parameters
         self.signal_timespan = signal_timespan
@@ -102,13 +148,24 @@ class BlingBot:
         self.daily_pnl_threshold = daily_pnl_threshold
         self.daily_gain_target = daily_gain_target
         
-        # Signal caching
+        # Signal caching - wall-clock time for display, monotonic time for the recalculation check
         self.last_signal_time = None
+        self._last_signal_mono = -math.inf
         self.cached_signal = None
         
         # Current position tracking
         self.current_position = 0
         
+        # Last fetched position as (qty, absolute market value or None), None when flat - reused until invalidated
+        self._position_cache = None
+        self._position_cache_valid = False
+        
+        # Fixed fields of the BUY market order - only the notional changes per trade
+        self._buy_order_kwargs = dict(symbol=symbol, side=OrderSide.BUY, time_in_force=TimeInForce.DAY)
+        
+        # Worker that fetches the position while the signal is being calculated
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bling-{symbol}")
+        
         # Initialize config manager for value persistence
         self.config_manager = ConfigManager()
         
@@ -134,18 +191,14 @@ class BlingBot:
             raise
         
         # Initialize Alpaca trading client
-        self.api_key = os.getenv('ALPACA_API_KEY') or os.getenv('ALPACA_KEY')
-        self.api_secret = os.getenv('ALPACA_API_SECRET') or os.getenv('ALPACA_SECRET')
+        self.api_key = _ALPACA_KEY
+        self.api_secret = _ALPACA_SECRET
         
         if not self.api_key or not self.api_secret:
             raise ValueError("ALPACA_API_KEY/ALPACA_KEY and ALPACA_API_SECRET/ALPACA_SECRET environment variables must be set")
         
         try:
-            self.trading_client = TradingClient(
-                api_key=self.api_key,
-                secret_key=self.api_secret,
-                paper=self.paper
-            )
+            self.trading_client = self._create_trading_client()
             self.logger.info(f"✅ Alpaca trading client initialized ({'paper' if self.paper else 'live'} trading)")
         except Exception as e:
             self.logger.error(f"❌ Failed to initialize Alpaca client: {e}")
@@ -188,16 +241,49 @@ class BlingBot:
             else:
                 self.config_manager.update_current_value(self.symbol, new_value)
                 
-            self.logger.debug(f"Updated and persisted current value: ${self.current_value:.2f}")
+            self.logger.debug("Updated and persisted current value: $%.2f", self.current_value)
+    
+    def _create_trading_client(self):
+        """Create the Alpaca trading client, reusing the shared HTTP session if one was given"""
+        trading_client = TradingClient(
+            api_key=self.api_key,
+            secret_key=self.api_secret,
+            paper=self.paper
+        )
+        if self.session is not None:
+            # Credentials are sent as per-request headers, so bots can share one keep-alive session
+            trading_client._session = self.session
+        else:
+            # Keep a small pool of keep-alive connections and retry dropped connections.
+            # HTTP status retries are left to the Alpaca client, which already retries 429/504.
+            trading_client._session.mount("https://", _TimeoutHTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=4,
+                max_retries=Retry(total=3, backoff_factor=0.1, respect_retry_after_header=False),
+                timeout=ALPACA_TIMEOUT
+            ))
+        return trading_client
+    
+    def _rate_limited(self, fn, *args, **kwargs):
+        """
+        Call an Alpaca client method, waiting only as long as needed to stay under the account rate limit.
+        
+        :param fn: Trading client method to call
+        :return: Whatever fn returns
+        """
+        with BlingBot._alpaca_lock:
+            now = time.monotonic()
+            wait = BlingBot._alpaca_next_ok - now
+            BlingBot._alpaca_next_ok = max(now, BlingBot._alpaca_next_ok) + ALPACA_MIN_INTERVAL
+        
+        if wait > 0:
+            time.sleep(wait)
+        return fn(*args, **kwargs)
     
     def reconnect(self):
         """Reconnect to Alpaca API (for error recovery)"""
         try:
-            self.trading_client = TradingClient(
-                api_key=self.api_key,
-                secret_key=self.api_secret,
-                paper=self.paper
-            )
+            self.trading_client = self._create_trading_client()
             self.logger.info("✅ Alpaca client reconnected")
         except Exception as e:
             self.logger.error(f"❌ Failed to reconnect Alpaca client: {e}")
@@ -205,16 +291,12 @@ class BlingBot:
     
     def _should_recalculate(self):
         """Check if it's time to recalculate the signal"""
-        if self.last_signal_time is None:
-            return True
-        
-        time_since_last = datetime.now() - self.last_signal_time
-        return time_since_last.total_seconds() >= (self.interval_minutes * 60)
+        return time.monotonic() - self._last_signal_mono >= self._interval_seconds
     
     def get_signal(self):
         """Get fresh trading signal from the configured algorithm"""
         try:
-            self.logger.info(f"🔄 Fetching fresh signal for {self.symbol}")
+            self.logger.info("🔄 Fetching fresh signal for %s", self.symbol)
             
             # Get signal from trading algorithm
             signal_info = self.algo.get_signal(
@@ -224,8 +306,9 @@ class BlingBot:
             # Cache the signal
             self.cached_signal = signal_info
             self.last_signal_time = datetime.now()
+            self._last_signal_mono = time.monotonic()
             
-            self.logger.info(f"📊 Signal: {signal_info['signal']} - {signal_info['reason']}")
+            self.logger.info("📊 Signal: %s - %s", signal_info['signal'], signal_info['reason'])
             
             return signal_info
             
@@ -250,41 +333,79 @@ class BlingBot:
         return float(self.current_value)
     
     def calculate_pnl(self):
-        """Calculate daily P&L percentage"""
-        return (self.current_value - self.initial_value) / self.initial_value
+        """
+        Calculate daily P&L percentage.
+        Reads current_value only, so call get_open_position() first for an up-to-date figure.
+        """
+        return (self.current_value - self.initial_value) * self._inv_init
+    
+    def _get_position_cached(self):
+        """
+        Fetch the open position from Alpaca, reusing the last response until the cache is invalidated.
+        run() invalidates it once per cycle and every order invalidates it, so a cycle costs one lookup
+        however long the signal fetch takes. The public get_open_position() always refetches.
+        
+        :return: Tuple of (qty, absolute market value or None) parsed from the position, or None if no position exists
+        """
+        if not self._position_cache_valid:
+            try:
+                position = self._rate_limited(self.trading_client.get_open_position, self.symbol)
+            except APIError as e:
+                # 404 means no position exists - anything else is a real failure and must not reset the value
+                if e.status_code != 404:
+                    raise
+                self._position_cache = None
+            else:
+                # Alpaca returns numbers as strings - parse them once per fetch.
+                # Short positions have a negative market value, but the per-symbol value is its size.
+                market_value = abs(float(position.market_value)) if position.market_value else None
+                self._position_cache = (float(position.qty), market_value)
+            self._position_cache_valid = True
+        return self._position_cache
+    
+    def _invalidate_position_cache(self):
+        """Force the next position lookup to go to Alpaca"""
+        self._position_cache_valid = False
     
     def get_open_position(self):
         """
-        Get current open position for the symbol and update current_position and current_value.
+        Get current open position for the symbol from Alpaca and update current_position and current_value.
         Returns position quantity or 0 if no position exists.
         """
-        try:
-            position = self.trading_client.get_open_position(self.symbol)
-            qty = float(position.qty)
-            self.current_position = qty
-            
-            # Update current_value using market_value from position
-            if position.market_value:
-                market_value = float(position.market_value)
-                new_value = abs(market_value)  # Use abs for short positions
-                self._update_current_value(new_value)
-                self.logger.debug(f"Open position: {qty} shares, Market value: ${market_value:.2f}")
-            else:
-                self.logger.debug(f"Open position: {qty} shares (no market value)")
-            
-            return qty
-        except Exception:
+        self._invalidate_position_cache()
+        return self._sync_position()
+    
+    def _sync_position(self):
+        """
+        Update current_position and current_value from the position cached for this cycle.
+        Returns position quantity or 0 if no position exists.
+        """
+        position = self._get_position_cached()
+        if position is None:
             # No position exists - reset to initial value
             self.current_position = 0
             self._update_current_value(self.initial_value)
             self.logger.debug("No open position - reset to initial value")
             return 0
+        
+        qty, market_value = position
+        self.current_position = qty
+        
+        # Update current_value using market_value from position
+        if market_value is not None:
+            self._update_current_value(market_value)
+            self.logger.debug("Open position: %s shares, Market value: $%.2f", qty, market_value)
+        else:
+            self.logger.debug("Open position: %s shares (no market value)", qty)
+        
+        return qty
     
     def close_position(self):
         """Close current position using Alpaca's close_position method"""
         try:
             # Use Alpaca's close_position method - it handles checking if position exists
-            close_response = self.trading_client.close_position(symbol_or_asset_id=self.symbol)
+            close_response = self._rate_limited(self.trading_client.close_position, symbol_or_asset_id=self.symbol)
+            self._invalidate_position_cache()
             
             if hasattr(close_response, 'order_id') and close_response.order_id:
                 self.logger.info(f"✅ Position close order submitted: {close_response.order_id}")
@@ -303,20 +424,20 @@ class BlingBot:
     def execute_trade(self, signal):
         """Execute trade based on signal"""
         try:
+            # Nothing to act on - skip the position lookup
+            if signal['signal'] in self._NO_TRADE_SIGNALS:
+                return False
+            
             # Update current position
-            current_position = self.get_open_position()
+            current_position = self._sync_position()
             
             # Handle BUY signal
             if signal['signal'] == 'BUY':
                 if current_position == 0:  # No position, can buy
-                    order_data = MarketOrderRequest(
-                        symbol=self.symbol,
-                        notional=str(self.current_value),
-                        side=OrderSide.BUY,
-                        time_in_force=TimeInForce.DAY
-                    )
+                    order_data = MarketOrderRequest(notional=str(self.current_value), **self._buy_order_kwargs)
                     
-                    self.trading_client.submit_order(order_data=order_data)
+                    self._rate_limited(self.trading_client.submit_order, order_data=order_data)
+                    self._invalidate_position_cache()
                     self.logger.info(f"✅ BUY order submitted: ${self.current_value:.2f} of {self.symbol}")
                     return True
                 else:
@@ -338,14 +459,41 @@ class BlingBot:
             self.logger.error(f"❌ Error executing trade: {e}")
             return False
     
+    def simulate(self, closes):
+        """
+        Backtest the trading rules over historical close prices without calling Alpaca.
+        BUY opens a position with the whole per-symbol value when flat and SELL closes it,
+        so the bot is long exactly while the latest signal is BUY. Fills are assumed at the signalling bar's close.
+        
+        :param closes: Close prices, oldest first
+        :return: Tuple of (int8 signal per bar from the algorithm's simulate(), per-symbol value per bar)
+        :raises TypeError: If the algorithm has no simulate() method (only the aggregates-based algorithm replays locally)
+        """
+        simulate_signals = getattr(self.algo, 'simulate', None)
+        if simulate_signals is None:
+            raise TypeError(f"{type(self.algo).__name__} does not support simulate() - use SmaEmaCrossoverAlgoAgg to backtest")
+        
+        closes = np.asarray(closes, dtype=np.float64)
+        signals = simulate_signals(closes)
+        if not len(closes):
+            return signals, np.empty(0)
+        
+        # Bar-to-bar growth while holding a position, flat otherwise
+        growth = np.where(signals[:-1] == 1, closes[1:] / closes[:-1], 1.0)
+        values = self.initial_value * np.concatenate(([1.0], np.cumprod(growth)))
+        return signals, values
+    
     def run(self):
         """Run one trading cycle"""
         try:
-            # Update position info and per-symbol equity
-            self.get_open_position()
+            # Position info is fetched once per cycle and reused for the rest of it
+            self._invalidate_position_cache()
             
             # Check if we need to recalculate the signal
             if not self._should_recalculate():
+                # Update position info and per-symbol equity
+                self._sync_position()
+                
                 # Not time to recalculate yet, return cached signal
                 cached_signal = self.get_cached_signal()
                 return {
@@ -357,8 +505,10 @@ class BlingBot:
                     'recalculated': False
                 }
             
-            # Time to recalculate - get a fresh signal
+            # Time to recalculate - update the position on Alpaca while the algorithm fetches a fresh signal
+            position_future = self._io_pool.submit(self._sync_position)
             signal = self.get_signal()
+            position_future.result()
             
             # Execute trade based on signal
             trade_executed = self.execute_trade(signal)
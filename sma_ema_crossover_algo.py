@@ -1,9 +1,22 @@
 import os
-import pandas as pd
 import logging
 from datetime import datetime
 from polygon import RESTClient
 import time
+from collections import deque
+
+# (signal, reason, crossover_type) indexed by whether EMA is below SMA - shared with SmaEmaCrossoverAlgoAgg
+_SIGNALS = (
+    ("BUY", "EMA(5-min avg) above SMA(5-min avg) - bullish trend", "bullish"),
+    ("SELL", "EMA(5-min avg) below SMA(5-min avg) - bearish trend", "bearish"),
+)
+
+# (signal, reason, crossover_type) indexed by is_above - was_above: 0 no change, 1 crossed up, -1 crossed down
+_CROSSOVERS = (
+    (None, "No crossover - keeping last signal", None),
+    ("BUY", "EMA crossed above SMA - bullish crossover", "bullish"),
+    ("SELL", "EMA crossed below SMA - bearish crossover", "bearish"),
+)
 
 class SmaEmaCrossoverAlgo:
     """
@@ -45,6 +58,59 @@ class SmaEmaCrossoverAlgo:
         # Signal state tracking
         self.current_signal = None  # Will be 'BUY' or 'SELL'
         
+        # Cached indicator values: (kind, symbol, window) -> (deque of (timestamp, value) oldest first, running sum)
+        self._indicator_windows = {}
+        
+    def _rolling_indicator_mean(self, kind, symbol, window, limit):
+        """
+        Fetch the latest indicator values from Polygon and return their mean.
+        Once a full window is cached only values at or after its newest timestamp are requested,
+        so the bar that is still forming is revised and just the newly closed bars roll in.
+        
+        :param kind: Indicator endpoint, 'sma' or 'ema'
+        :param symbol: Stock symbol
+        :param window: Indicator window/period for 5-minute intervals
+        :param limit: Number of indicator values to average
+        :return: Tuple of (mean value, latest epoch-ms timestamp, number of values held)
+        """
+        key = (kind, symbol, window)
+        values, total = self._indicator_windows.get(key, (None, 0.0))
+        params = {}
+        if values is not None and len(values) == limit:
+            params['timestamp_gte'] = values[-1][0]
+        else:
+            values, total = deque(maxlen=limit), 0.0
+        
+        response = getattr(self.client, f'get_{kind}')(
+            ticker=symbol,
+            timespan='minute',
+            adjusted=False,
+            window=window,
+            series_type='close',
+            order='desc',  # Get most recent values first
+            limit=limit,
+            **params
+        )
+        
+        # Walk oldest first so new bars append in order
+        for item in reversed(response.values or []):
+            value = float(item.value)
+            if values and item.timestamp == values[-1][0]:
+                # Same bar still forming - replace its value
+                total += value - values[-1][1]
+                values[-1] = (item.timestamp, value)
+            elif not values or item.timestamp > values[-1][0]:
+                if len(values) == limit:
+                    total -= values[0][1]
+                values.append((item.timestamp, value))
+                total += value
+        
+        self._indicator_windows[key] = (values, total)
+        
+        if not values:
+            return None, None, 0
+        return total / len(values), values[-1][0], len(values)
+    
     def get_sma(self, symbol, window=5, limit=21):
         """
         Get Simple Moving Average values
@@ -56,32 +122,15 @@ class SmaEmaCrossoverAlgo:
         try:
             self.logger.info(f"Fetching {limit} SMA({window}) values at 5-minute intervals for {symbol}")
             
-            # Use Polygon's SMA endpoint with 5-minute intervals
-            sma_response = self.client.get_sma(
-                ticker=symbol,
-                timespan='minute',
-                adjusted=False,
-                window=window,  # 5-minute window
-                series_type='close',
-                order='desc',  # Get most recent values first
-                limit=limit    # Fetch 21 values
-            )
-            
-            # Extract SMA values from response
-            sma_values = []
-
-            for item in sma_response.values:
-                sma_values.append(float(item.value))
+            # Use Polygon's SMA endpoint with 5-minute intervals, fetching only values newer than the cached window
+            mean_sma, timestamp_ms, count = self._rolling_indicator_mean('sma', symbol, window, limit)
 
-            if sma_values and len(sma_values) == limit:
-                mean_sma = sum(sma_values) / len(sma_values)
-
-                timestamp_ms = sma_response.values[0].timestamp
+            if count == limit:
                 local_time = datetime.fromtimestamp(timestamp_ms/1000).strftime('%Y-%m-%d %H:%M:%S')
-                self.logger.info(f"✅ Fetched {len(sma_values)} SMA values, mean SMA: ${mean_sma:.4f}. Local time: {local_time}")
+                self.logger.info(f"✅ Fetched {count} SMA values, mean SMA: ${mean_sma:.4f}. Local time: {local_time}")
                 return mean_sma
             else:
-                self.logger.warning(f"Expected {limit} SMA values but got {len(sma_values)} for {symbol}")
+                self.logger.warning(f"Expected {limit} SMA values but got {count} for {symbol}")
                 return None
                 
         except Exception as e:
@@ -101,29 +150,14 @@ class SmaEmaCrossoverAlgo:
         try:
             self.logger.info(f"Fetching {limit} EMA({window}) values at 5-minute intervals for {symbol}")
             
-            # Use Polygon's EMA endpoint with 5-minute intervals
-            ema_response = self.client.get_ema(
-                ticker=symbol,
-                timespan='minute',
-                adjusted=False,
-                window=window,  # 5-minute window
-                series_type='close',
-                order='desc',  # Get most recent values first
-                limit=limit
-            )
+            # Use Polygon's EMA endpoint with 5-minute intervals, fetching only values newer than the cached window
+            mean_ema, _, count = self._rolling_indicator_mean('ema', symbol, window, limit)
             
-            # Extract EMA values from response
-            ema_values = []
-
-            for item in ema_response.values:
-                ema_values.append(float(item.value))
-            
-            if ema_values and len(ema_values) == limit:
-                mean_ema = sum(ema_values) / len(ema_values)
-                self.logger.info(f"✅ Fetched {len(ema_values)} EMA values, mean EMA: ${mean_ema:.4f}")
+            if count == limit:
+                self.logger.info(f"✅ Fetched {count} EMA values, mean EMA: ${mean_ema:.4f}")
                 return mean_ema
             else:
-                self.logger.warning(f"Expected {limit} EMA values but got {len(ema_values)} for {symbol}")
+                self.logger.warning(f"Expected {limit} EMA values but got {count} for {symbol}")
                 return None
                 
         except Exception as e:
@@ -144,7 +178,7 @@ class SmaEmaCrossoverAlgo:
                 return {
                     'sma': current_sma,
                     'ema': current_ema,
-                    'timestamp': pd.Timestamp.now()
+                    'timestamp': datetime.now()
                 }
             else:
                 self.logger.warning(f"Failed to get indicators from Polygon for {symbol}")
@@ -154,6 +188,38 @@ class SmaEmaCrossoverAlgo:
             self.logger.error(f"❌ Error getting current indicators for {symbol}: {e}")
             return None
     
+    def detect_crossover_last(self, ema_prev, sma_prev, ema_cur, sma_cur, price, timestamp):
+        """
+        Detect an EMA/SMA crossover from two adjacent samples only.
+        The signal changes on a crossover and the last signal is kept otherwise,
+        so feeding bars in order reproduces a full-history scan in O(1) per bar.
+        
+        :param ema_prev: EMA of the previous bar
+        :param sma_prev: SMA of the previous bar
+        :param ema_cur: EMA of the current bar
+        :param sma_cur: SMA of the current bar
+        :param price: Close price of the current bar
+        :param timestamp: Timestamp of the current bar
+        :return: Dict with signal information
+        """
+        was_above = ema_prev > sma_prev
+        is_above = ema_cur > sma_cur
+        
+        # Sign change of EMA - SMA between the two bars picks the row - no branching on the comparison
+        signal, reason, crossover_type = _CROSSOVERS[int(is_above) - int(was_above)]
+        self.current_signal = signal or self.current_signal
+        
+        return {
+            "signal": self.current_signal or "NONE",
+            "reason": reason,
+            "price": price,
+            "timestamp": timestamp,
+            "ema": ema_cur,
+            "sma": sma_cur,
+            "ema_above_sma": is_above,
+            "crossover_type": crossover_type
+        }
+    
     def get_signal(self, symbol):
         """
         Get trading signal for a symbol based on EMA/SMA crossover.
@@ -172,18 +238,8 @@ class SmaEmaCrossoverAlgo:
                 current_ema = indicators['ema']
                 current_timestamp = indicators['timestamp']
                                 
-                # Determine signal based on EMA vs SMA position
-                if current_ema < current_sma:
-                    # EMA below SMA - bearish signal
-                    self.current_signal = "SELL"
-                    reason = f"EMA(5-min avg) below SMA(5-min avg) - bearish trend"
-                    crossover_type = "bearish"
-                else:
-                    # EMA above SMA - bullish signal
-                    # Signal changed to BUY
-                    self.current_signal = "BUY"
-                    reason = f"EMA(5-min avg) above SMA(5-min avg) - bullish trend"
-                    crossover_type = "bullish"
+                # Determine signal based on EMA vs SMA position - index 1 when EMA is below SMA
+                self.current_signal, reason, crossover_type = _SIGNALS[current_ema < current_sma]
                 
                 signal_info = {
                     "signal": self.current_signal,
@@ -1,9 +1,68 @@
 import os
-import pandas as pd
+import numpy as np
 import logging
-from datetime import datetime, timedelta
 from polygon import RESTClient
 import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from sma_ema_crossover_algo import _SIGNALS
+
+try:
+    from numba import njit, types
+except ImportError:
+    # numba not available, kernels run as plain Python
+    njit = None
+
+
+def _kernel(*scalar_args):
+    """
+    Compile a float64 array kernel eagerly when numba is available, so the JIT cost is paid
+    at import (and cached on disk) rather than on the first signal. The array is typed read-only
+    so the one signature accepts writable buffers as well as pandas' read-only views.
+    
+    :param scalar_args: numba type names of the arguments that follow the array
+    """
+    if njit is None:
+        return lambda fn: fn
+    array = types.Array(types.float64, 1, 'A', readonly=True)
+    scalars = [getattr(types, name) for name in scalar_args]
+    return njit(types.float64(array, *scalars), cache=True)
+
+
+@_kernel('int64', 'float64')
+def _ewma_last_desc(a, n, alpha):
+    """
+    Latest EMA value over the first n elements of a (most recent first),
+    seeded with the oldest of them. Walks the array backwards so no reversed copy is needed.
+    """
+    ema = a[n - 1]
+    for i in range(n - 2, -1, -1):
+        ema = alpha * a[i] + (1 - alpha) * ema
+    return ema
+
+# Polygon clients shared by all algorithm instances, keyed by API key
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+# Keep-alive connections kept per host - one per concurrently polling bot
+_POOL_MAXSIZE = 10
+
+
+def _get_client(api_key):
+    """
+    Return the shared Polygon client for an API key, creating it on first use.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            client = RESTClient(api_key=api_key)
+            # RESTClient's urllib3 PoolManager keeps a single connection per host by default,
+            # so bots polling from separate threads would otherwise reconnect on every request
+            client.client.connection_pool_kw['maxsize'] = _POOL_MAXSIZE
+            _CLIENTS[api_key] = client
+        return client
 
 class SmaEmaCrossoverAlgoAgg:
     """
@@ -11,6 +70,9 @@ class SmaEmaCrossoverAlgoAgg:
     Detects EMA/SMA crossovers for trading signals.
     """
     
+    __slots__ = ('logger', 'api_key', 'client', 'ema_period', 'sma_period', 'current_signal',
+                 '_bar_state', '_close_bufs')
+    
     def __init__(self, api_key=None):
         """
         Initialize the SMA/EMA crossover algorithm.
@@ -30,9 +92,9 @@ class SmaEmaCrossoverAlgoAgg:
         if not self.api_key:
             raise ValueError("Polygon API key required. Set POLYGON_API_KEY environment variable or pass api_key parameter.")
         
-        # Initialize Polygon client
+        # Initialize Polygon client (shared with other instances using the same key)
         try:
-            self.client = RESTClient(api_key=self.api_key)
+            self.client = _get_client(self.api_key)
             self.logger.info("✅ Polygon client initialized successfully")
         except Exception as e:
             self.logger.error(f"❌ Failed to initialize Polygon client: {e}")
@@ -45,128 +107,287 @@ class SmaEmaCrossoverAlgoAgg:
         # Signal state tracking
         self.current_signal = None  # Will be 'BUY' or 'SELL'
         
-    def get_sma(self, aggs):
+        # Incremental indicator state per symbol
+        self._bar_state = {}  # (symbol, multiplier, limit) -> (deque of closes oldest first, running sum, latest bar timestamp)
+        self._close_bufs = {}  # symbol -> reusable float64 buffer of close prices
+        
+    def get_sma(self, closes):
         """
-        Calculate Simple Moving Average from aggregates
-        :param aggs: List of aggregate objects from list_aggs
+        Calculate Simple Moving Average from close prices
+        :param closes: Array of close prices, most recent first
         :return: Latest SMA value or None
         """
         try:
-            if not aggs:
+            if len(closes) == 0:
                 return None
-                
-            # Extract close prices from aggregates
-            close_prices = [agg.close for agg in aggs]
             
-            if len(close_prices) >= self.sma_period:
-                # Calculate SMA from the most recent prices
-                # Take the first sma_period prices (since sorted desc, these are most recent)
-                latest_sma = sum(close_prices) / len(close_prices)
-                return latest_sma
-            else:
-                # Use all available prices if we don't have enough for the full period
-                latest_sma = sum(close_prices) / len(close_prices)
-                return latest_sma
+            # Average all fetched prices - uses fewer than sma_period if that's all we have
+            return float(closes.sum()) / len(closes)
                 
         except Exception as e:
             return None
     
-    def get_ema(self, aggs):
+    def get_ema(self, closes):
         """
-        Calculate Exponential Moving Average from aggregates
-        :param aggs: List of aggregate objects from list_aggs
+        Calculate Exponential Moving Average from close prices
+        :param closes: Array of close prices, most recent first
         :return: Latest EMA value or None
         """
         try:
-            if not aggs:
+            if len(closes) == 0:
                 return None
                 
-            # EMA only needs the first 9 aggregates (most recent since sorted desc)
-            close_prices = list(reversed([agg.close for agg in aggs[:self.ema_period]]))
+            ema_period = self.ema_period
             
-            if len(close_prices) >= self.ema_period:
-                # Calculate EMA using exponential smoothing
-                alpha = 2.0 / (self.ema_period + 1)
-                ema = close_prices[0]  # Start with first price
-                
-                for price in close_prices[1:]:
-                    ema = alpha * price + (1 - alpha) * ema
-                
-                return ema
+            if len(closes) >= ema_period:
+                # EMA only needs the first 9 closes (most recent since sorted desc)
+                alpha = 2.0 / (ema_period + 1)
+                return float(_ewma_last_desc(closes, ema_period, alpha))
             else:
                 # Use simple average if we don't have enough data points
-                return sum(close_prices) / len(close_prices)
+                return float(closes.sum()) / len(closes)
                 
         except Exception as e:
             return None
 
 
+    def get_sma_series(self, closes, n):
+        """
+        Calculate the full Simple Moving Average series using a cumulative sum
+        :param closes: Array of close prices, oldest first
+        :param n: SMA window
+        :return: Array of len(closes) - n + 1 SMA values, oldest first
+        """
+        cs = np.cumsum(closes, dtype=np.float64)
+        cs[n:] = cs[n:] - cs[:-n]
+        return cs[n - 1:] / n
+    
+    def _fetch_aggs(self, symbol, multiplier, limit):
+        """
+        Fetch the most recent aggregates for a symbol from the last day
+        :param symbol: Stock symbol
+        :param multiplier: Multiplier for timespan
+        :param limit: Maximum number of aggregates to return
+        :return: List of aggregate objects, most recent first
+        """
+        # Calculate date range in epoch ms - get a day of data
+        t = time.time()
+        start_ms = int((t - 86400) * 1000)
+        end_ms = int(t * 1000)
+        
+        iterator = self.client.list_aggs(
+            symbol,
+            multiplier,  # 5-minute intervals
+            "minute",
+            start_ms,
+            end_ms,
+            adjusted="false",
+            sort="desc",  # Most recent first
+            # Polygon's limit counts the base minute aggregates the bars are built from, not the bars
+            # returned - allow a full multiplier per bar plus one bar for the one still forming
+            limit=(limit + 1) * multiplier,
+        )
+        
+        # Stop after limit items without advancing the paginating iterator any further
+        return list(islice(iterator, limit))
+    
+    def _extract_closes(self, symbol, aggs, limit):
+        """
+        Copy close prices into the symbol's reusable buffer
+        :param symbol: Stock symbol
+        :param aggs: List of aggregate objects from list_aggs, most recent first
+        :param limit: Maximum number of aggregates the buffer must hold
+        :return: Array view of the close prices, most recent first
+        """
+        buf = self._close_bufs.get(symbol)
+        if buf is None or len(buf) < limit:
+            buf = self._close_bufs[symbol] = np.empty(limit, dtype=np.float64)
+        for i, a in enumerate(aggs):
+            buf[i] = a.close
+        return buf[:len(aggs)]
+    
+    def _seed_indicators(self, key, closes, latest_timestamp):
+        """
+        Cache the window of close prices the batch indicators were computed from
+        :param key: Tuple of (symbol, multiplier, limit) the window was fetched with
+        :param closes: Close prices the indicators were computed from, most recent first
+        :param latest_timestamp: Timestamp of the most recent bar
+        """
+        window = deque(closes[::-1].tolist(), maxlen=key[2])
+        self._bar_state[key] = (window, sum(window), latest_timestamp)
+    
+    def _update_indicators(self, key, aggs):
+        """
+        Roll the cached close window forward with the newest aggregates.
+        The SMA is updated from a running sum in O(1); the EMA is recomputed from the newest
+        ema_period closes in O(ema_period), so it matches the batch get_ema exactly.
+        
+        :param key: Tuple of (symbol, multiplier, limit) the window was fetched with
+        :param aggs: The newest one or two aggregates, most recent first
+        :return: Tuple of (sma, ema, latest_timestamp), or None if bars were missed
+        """
+        window, total, last_ts = self._bar_state[key]
+        latest = aggs[0]
+        
+        if latest.timestamp != last_ts:
+            if len(aggs) < 2 or aggs[1].timestamp != last_ts:
+                # More than one new bar since the last poll - caller recomputes from scratch
+                return None
+            
+            # Settle the final close of the cached bar, then roll the window forward
+            close = aggs[1].close
+            total += close - window[-1]
+            window[-1] = close
+            
+            if len(window) == window.maxlen:
+                total -= window[0]
+            window.append(latest.close)
+            total += latest.close
+        else:
+            # Same bar still forming - replace its close
+            total += latest.close - window[-1]
+            window[-1] = latest.close
+        
+        self._bar_state[key] = (window, total, latest.timestamp)
+        
+        # Newest closes first, as get_ema expects
+        count = min(len(window), self.ema_period)
+        recent = np.fromiter(islice(reversed(window), count), dtype=np.float64, count=count)
+        
+        return total / len(window), self.get_ema(recent), latest.timestamp
+
     def get_current_indicators(self, symbol, multiplier=5, limit=21):
         """
-        Get current SMA and EMA values
+        Get current SMA and EMA values.
+        After the first call for a symbol, multiplier and limit only the newest two aggregates
+        are fetched and the cached indicators are updated incrementally.
+        
         :param symbol: Stock symbol
         :param multiplier: Multiplier for timespan (default: 5 for 5-minute intervals)
         :param limit: Number of aggregates to fetch (default: 21)
-        :return: Dict with current SMA and EMA values, or None if failed
+        :return: Dict with current SMA and EMA values and the latest bar's epoch-ms timestamp, or None if failed
         """
         try:
-            self.logger.info(f"Fetching aggregates for {symbol} to calculate SMA({self.sma_period}) and EMA({self.ema_period})")
-            
-            # Calculate date range - get enough data for SMA calculation
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=1)  # Get a day of data
-            
-            # Use list_aggs to get aggregates
-            aggs = []
-            count = 0
-            latest_timestamp = None
+            log_info = self.logger.isEnabledFor(logging.INFO)
+            indicators = None
+            key = (symbol, multiplier, limit)
             
-            for a in self.client.list_aggs(
-                symbol,
-                multiplier,  # 5-minute intervals
-                "minute",
-                int(start_date.timestamp() * 1000),
-                int(end_date.timestamp() * 1000),
-                adjusted="false",
-                sort="desc",  # Most recent first
-            ):
-                if count >= limit:
-                    break
-                aggs.append(a)
-                if not latest_timestamp:
-                    latest_timestamp = a.timestamp
-                count += 1
+            if key in self._bar_state:
+                aggs = self._fetch_aggs(symbol, multiplier, 2)
+                if not aggs:
+                    self.logger.warning("No aggregates retrieved for %s", symbol)
+                    return None
+                indicators = self._update_indicators(key, aggs)
             
-            if aggs:
-                self.logger.info(f"✅ Fetched {len(aggs)} aggregates for {symbol}")
+            if indicators is None:
+                if log_info:
+                    self.logger.info("Fetching aggregates for %s to calculate SMA(%d) and EMA(%d)", symbol, self.sma_period, self.ema_period)
+                
+                aggs = self._fetch_aggs(symbol, multiplier, limit)
+                if not aggs:
+                    self.logger.warning("No aggregates retrieved for %s", symbol)
+                    return None
                 
-                # Calculate SMA and EMA from the aggregates
-                current_sma = self.get_sma(aggs)
-                current_ema = self.get_ema(aggs)
+                if log_info:
+                    self.logger.info("✅ Fetched %d aggregates for %s", len(aggs), symbol)
                 
-                if current_sma is not None and current_ema is not None:
-                    if latest_timestamp:
-                        local_time = datetime.fromtimestamp(latest_timestamp/1000).strftime('%Y-%m-%d %H:%M:%S')
-                        self.logger.info(f"✅ Calculated SMA({self.sma_period}): ${current_sma:.4f}, EMA({self.ema_period}): ${current_ema:.4f}. Local time: {local_time}")
-                    else:
-                        self.logger.info(f"✅ Calculated SMA({self.sma_period}): ${current_sma:.4f}, EMA({self.ema_period}): ${current_ema:.4f}")
-                    
-                    return {
-                        'sma': current_sma,
-                        'ema': current_ema,
-                        'timestamp': pd.Timestamp.now()
-                    }
-                else:
-                    self.logger.warning(f"Failed to calculate indicators from aggregates for {symbol}")
+                # Extract close prices once and share them between both indicators
+                closes = self._extract_closes(symbol, aggs, limit)
+                
+                # Calculate SMA and EMA from the close prices
+                current_sma = self.get_sma(closes)
+                current_ema = self.get_ema(closes)
+                
+                if current_sma is None or current_ema is None:
+                    self.logger.warning("Failed to calculate indicators from aggregates for %s", symbol)
                     return None
-            else:
-                self.logger.warning(f"No aggregates retrieved for {symbol}")
-                return None
+                
+                self._seed_indicators(key, closes, aggs[0].timestamp)
+                indicators = (current_sma, current_ema, aggs[0].timestamp)
+            
+            current_sma, current_ema, latest_timestamp = indicators
+            
+            if log_info:
+                local_time = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(latest_timestamp/1000))
+                self.logger.info("✅ Calculated SMA(%d): $%.4f, EMA(%d): $%.4f. Local time: %s",
+                                 self.sma_period, current_sma, self.ema_period, current_ema, local_time)
+            
+            return {
+                'sma': current_sma,
+                'ema': current_ema,
+                'timestamp': latest_timestamp  # epoch ms of the latest bar
+            }
                 
         except Exception as e:
             self.logger.error(f"❌ Error getting current indicators for {symbol}: {e}")
             return None
     
+    def _signal_from_indicators(self, indicators):
+        """
+        Build the signal dict from current SMA and EMA values and update current_signal
+        :param indicators: Dict with 'sma', 'ema' and 'timestamp'
+        :return: Dict with signal information
+        """
+        current_sma = indicators['sma']
+        current_ema = indicators['ema']
+        
+        # Determine signal based on EMA vs SMA position - index 1 when EMA is below SMA
+        signal, reason, crossover_type = _SIGNALS[current_ema < current_sma]
+        self.current_signal = signal
+        
+        return {
+            "signal": signal,
+            "reason": reason,
+            "timestamp": indicators['timestamp'],
+            "ema": current_ema,
+            "sma": current_sma,
+            "ema_above_sma": current_ema > current_sma,
+            "crossover_type": crossover_type
+        }
+    
+    def get_signal_from_df(self, df):
+        """
+        Get trading signal from a DataFrame of aggregates, without calling Polygon.
+        
+        :param df: DataFrame with 'close' and 'timestamp' columns, oldest first
+        :return: Dict with signal information, or None if df is empty
+        """
+        if df.empty:
+            return None
+        
+        # Most recent first, matching the order list_aggs returns
+        closes = df['close'].to_numpy(dtype=np.float64)[::-1]
+        
+        return self._signal_from_indicators({
+            'sma': self.get_sma(closes[:self.sma_period]),
+            'ema': self.get_ema(closes),
+            'timestamp': df['timestamp'].iloc[-1]
+        })
+    
+    def simulate(self, closes):
+        """
+        Replay the signal over a history of close prices in one vectorised pass, without calling Polygon.
+        Each bar gets the signal get_current_indicators() gives with that bar as the latest one.
+        
+        :param closes: Close prices, oldest first
+        :return: int8 array with one signal per bar: 1 for BUY, -1 for SELL, 0 until sma_period bars are available
+        """
+        closes = np.asarray(closes, dtype=np.float64)
+        signals = np.zeros(len(closes), dtype=np.int8)
+        n = self.sma_period
+        if len(closes) < n:
+            return signals
+        
+        # The batch EMA is seeded with the oldest of its ema_period bars, which makes it a fixed FIR filter
+        alpha = 2.0 / (self.ema_period + 1)
+        weights = alpha * (1 - alpha) ** np.arange(self.ema_period)  # Newest bar first
+        weights[-1] = (1 - alpha) ** (self.ema_period - 1)
+        
+        sma = np.convolve(closes, np.full(n, 1.0 / n), mode='valid')
+        ema = np.convolve(closes, weights, mode='valid')[n - self.ema_period:]
+        signals[n - 1:] = np.where(ema < sma, -1, 1)
+        return signals
+    
     def get_signal(self, symbol):
         """
         Get trading signal for a symbol based on EMA/SMA crossover.
@@ -180,53 +401,44 @@ class SmaEmaCrossoverAlgoAgg:
             indicators = self.get_current_indicators(symbol)
             
             if indicators:
-                # We have current SMA and EMA values
-                current_sma = indicators['sma']
-                current_ema = indicators['ema']
-                current_timestamp = indicators['timestamp']
-                                
-                # Determine signal based on EMA vs SMA position
-                if current_ema < current_sma:
-                    # EMA below SMA - bearish signal
-                    self.current_signal = "SELL"
-                    reason = f"EMA(5-min avg) below SMA(5-min avg) - bearish trend"
-                    crossover_type = "bearish"
-                else:
-                    # EMA above SMA - bullish signal
-                    # Signal changed to BUY
-                    self.current_signal = "BUY"
-                    reason = f"EMA(5-min avg) above SMA(5-min avg) - bullish trend"
-                    crossover_type = "bullish"
-                
-                signal_info = {
-                    "signal": self.current_signal,
-                    "reason": reason,
-                    "timestamp": current_timestamp,
-                    "ema": current_ema,
-                    "sma": current_sma,
-                    "ema_above_sma": current_ema > current_sma,
-                    "crossover_type": crossover_type
-                }
+                signal_info = self._signal_from_indicators(indicators)
                 
-                self.logger.info(f"🎯 Signal for {symbol}: {signal_info['signal']} - {signal_info['reason']}")
+                if self.logger.isEnabledFor(logging.INFO):
+                    self.logger.info("🎯 Signal for %s: %s - %s", symbol, signal_info['signal'], signal_info['reason'])
                 return signal_info
             
             else:
                 # No indicators available
-                self.logger.info(f"🎯 Signal not found {symbol}")
+                self.logger.info("🎯 Signal not found %s", symbol)
                 return {
-                    "signal": self.current_signal or "NONE",
+                    "signal": "NONE",
                 }
             
         except Exception as e:
             self.logger.error(f"❌ Error getting signal for {symbol}: {e}")
             return {
-                "signal": self.current_signal or "NONE", 
+                "signal": "NONE", 
                 "price": None, 
                 "reason": f"Error: {str(e)}",
                 "timestamp": None
             }
 
+    def get_signals_bulk(self, symbols, max_workers=_POOL_MAXSIZE):
+        """
+        Get trading signals for several symbols, fetching their aggregates concurrently
+        over the shared Polygon connection pool.
+        
+        :param symbols: List of stock symbols
+        :param max_workers: Maximum number of concurrent requests
+        :return: Dict mapping each symbol to its signal information
+        """
+        symbols = list(dict.fromkeys(symbols))  # Per-symbol state must only be touched by one thread
+        if len(symbols) <= 1:
+            return {symbol: self.get_signal(symbol) for symbol in symbols}
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols))) as executor:
+            return dict(zip(symbols, executor.map(self.get_signal, symbols)))
+
 
 def main():
     """
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Shared setup for the test scripts.
+"""
+
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# One keep-alive session shared by every bot the test scripts create, so TLS is negotiated once.
+# urllib3 already sets TCP_NODELAY on its sockets. Only connection failures are retried here -
+# the Alpaca client retries 429/504 itself, and retrying statuses too would multiply its attempts.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, respect_retry_after_header=False)
+))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() reserves tokens and returns how long the caller
+    must wait before using them, so concurrent workers pace themselves to the rate.
+    """
+    
+    def __init__(self, rate, burst):
+        """
+        :param rate: Tokens added per second
+        :param burst: Maximum number of tokens that can accumulate
+        """
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self, cost=1):
+        """
+        Reserve tokens for one call.
+        
+        :param cost: Number of tokens the call consumes
+        :return: Seconds to wait before making the call
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.ts) * self.rate)
+            self.ts = now
+            wait = max(0.0, (cost - self.tokens) / self.rate)
+            self.tokens -= cost
+            return wait
+
+# Requests per second allowed by the Polygon plan in use
+POLYGON_LIMIT = TokenBucket(rate=float(os.getenv('POLYGON_REQUESTS_PER_SECOND', 5)), burst=5)
+
+def rate_limit_polygon(client, bucket=POLYGON_LIMIT):
+    """
+    Throttle every HTTP request a Polygon RESTClient makes through a token bucket.
+    429 responses are already retried by the client, honouring Retry-After.
+    Clients are shared between algorithms, so a client is only wrapped the first time.
+    
+    :param client: Polygon RESTClient
+    :param bucket: TokenBucket shared by all throttled clients
+    :return: The same client
+    """
+    if getattr(client, '_rate_limited', False):
+        return client
+    get = client._get
+    
+    def limited_get(*args, **kwargs):
+        time.sleep(bucket.acquire())
+        return get(*args, **kwargs)
+    
+    client._get = limited_get
+    client._rate_limited = True
+    return client
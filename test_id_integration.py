@@ -4,8 +4,6 @@ Test script for ID-based bot initialization and configuration system.
 """
 
 from config_manager import ConfigManager
-from bling_bot import BlingBot
-from bling import create_bot_from_config_id
 import logging
 
 # Set up logging
@@ -48,6 +46,8 @@ def test_config_manager_id_functions():
 
 def test_bot_creation_from_id():
     """Test creating bots from config ID"""
+    from bling_bot import BlingBot
+    
     print("\n🤖 Testing bot creation from config ID...")
     
     config_manager = ConfigManager()
@@ -79,6 +79,8 @@ def test_bot_creation_from_id():
 
 def test_bling_integration():
     """Test bling.py integration with ID-based creation"""
+    from bling import create_bot_from_config_id
+    
     print("\n🎯 Testing bling.py integration...")
     
     config_manager = ConfigManager()
@@ -107,6 +109,8 @@ def test_bling_integration():
 
 def test_value_persistence():
     """Test that value updates persist correctly"""
+    from bling_bot import BlingBot
+    
     print("\n💾 Testing value persistence...")
     
     config_manager = ConfigManager()
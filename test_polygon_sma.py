@@ -4,11 +4,11 @@ Test script to demonstrate the Polygon SMA integration.
 Shows the difference between manual SMA calculation and Polygon's SMA endpoint.
 """
 
-from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
-import pandas as pd
 
 def test_polygon_sma_integration():
     """Test and compare Polygon SMA vs manual calculation"""
+    import pandas as pd
+    from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
     
     print("=== Polygon SMA Integration Test ===")
     
@@ -25,10 +25,10 @@ def test_polygon_sma_integration():
         )
         
         if polygon_sma_df is not None and not polygon_sma_df.empty:
-            latest_polygon_sma = polygon_sma_df['sma'].iloc[-1]
+            latest_polygon_sma = polygon_sma_df['sma'].to_numpy()[-1]
             print(f"   ✅ Polygon SMA(21): ${latest_polygon_sma:.2f}")
             print(f"   📊 Data points: {len(polygon_sma_df)}")
-            print(f"   ⏰ Latest timestamp: {polygon_sma_df['timestamp'].iloc[-1]}")
+            print(f"   ⏰ Latest timestamp: {polygon_sma_df['timestamp'].iat[-1]}")
         else:
             print("   ❌ Polygon SMA failed")
             return False
@@ -40,10 +40,10 @@ def test_polygon_sma_integration():
         price_df = algo.fetch_aggregates(symbol, timespan='minute', multiplier=5, days_back=1)
         if not price_df.empty:
             manual_sma = algo.calculate_sma_fallback(price_df, period=21)
-            latest_manual_sma = manual_sma.iloc[-1]
+            latest_manual_sma = manual_sma.to_numpy()[-1]
             print(f"   ✅ Manual SMA(21): ${latest_manual_sma:.2f}")
             print(f"   📊 Data points: {len(price_df)}")
-            print(f"   ⏰ Latest timestamp: {price_df['timestamp'].iloc[-1]}")
+            print(f"   ⏰ Latest timestamp: {price_df['timestamp'].iat[-1]}")
             
             # Compare the two methods
             if not pd.isna(latest_manual_sma):
@@ -62,13 +62,19 @@ def test_polygon_sma_integration():
         print("\n3. Testing full algorithm with Polygon SMA...")
         signal = algo.get_signal(symbol, timespan='minute', multiplier=5, days_back=1)
         
-        print(f"   📊 Signal: {signal['signal']}")
-        print(f"   💰 Price: ${signal['price']:.2f}" if signal['price'] else "   💰 Price: N/A")
-        print(f"   📝 Reason: {signal['reason']}")
+        price = signal.get('price')
+        ema = signal.get('ema')
+        sma = signal.get('sma')
         
-        if 'ema' in signal and 'sma' in signal:
-            print(f"   📈 EMA(9): ${signal['ema']:.2f}")
-            print(f"   📊 SMA(21): ${signal['sma']:.2f}")
+        lines = [
+            f"   📊 Signal: {signal['signal']}",
+            f"   💰 Price: ${price:.2f}" if price is not None else "   💰 Price: N/A",
+            f"   📝 Reason: {signal.get('reason')}",
+        ]
+        if ema is not None and sma is not None:
+            lines.append(f"   📈 EMA(9): ${ema:.2f}")
+            lines.append(f"   📊 SMA(21): ${sma:.2f}")
+        print("\n".join(lines))
         
         print("\n🎉 All tests completed successfully!")
         print("✅ Polygon SMA integration is working correctly")
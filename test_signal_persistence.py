@@ -4,52 +4,40 @@ Test script to demonstrate the new signal persistence behavior.
 This shows how signals are maintained between calls when no crossover occurs.
 """
 
-import pandas as pd
-from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
+import numpy as np
 
 def create_test_data():
-    """Create synthetic test data to demonstrate signal persistence."""
-    # Create test data with a clear crossover pattern
-    dates = pd.date_range('2023-01-01', periods=50, freq='5min')
+    """Create synthetic test data to demonstrate signal persistence.
     
-    # Create price data that will generate EMA/SMA crossover
-    prices = []
+    Returns a NumPy structured array with only the timestamp and close columns
+    the indicators are computed from.
+    """
+    # Create price data that will generate EMA/SMA crossover, one segment per phase
+    i = np.arange(50)
     base_price = 100
+    prices = np.piecewise(
+        i.astype(np.float32),
+        [i < 20, (i >= 20) & (i < 25), (i >= 25) & (i < 35), (i >= 35) & (i < 40), i >= 40],
+        [
+            lambda x: base_price - x * 0.5,                   # Declining trend - EMA will be below SMA
+            lambda x: base_price - 10 + (x - 20) * 2,         # Sharp upturn - will cause EMA to cross above SMA
+            lambda x: base_price - 2 + (x % 3) * 0.1,         # Flat period - no new crossover
+            lambda x: base_price - 2 - (x - 35) * 1.5,        # Decline - will cause EMA to cross below SMA
+            lambda x: base_price - 10 + (x % 2) * 0.1,        # Another flat period - no new crossover
+        ]
+    )
     
-    for i in range(50):
-        if i < 20:
-            # Declining trend - EMA will be below SMA
-            price = base_price - (i * 0.5)
-        elif i < 25:
-            # Sharp upturn - will cause EMA to cross above SMA
-            price = base_price - 10 + ((i - 20) * 2)
-        elif i < 35:
-            # Flat period - no new crossover
-            price = base_price - 2 + (i % 3) * 0.1
-        elif i < 40:
-            # Decline - will cause EMA to cross below SMA
-            price = base_price - 2 - ((i - 35) * 1.5)
-        else:
-            # Another flat period - no new crossover
-            price = base_price - 10 + (i % 2) * 0.1
-        
-        prices.append(price)
-    
-    df = pd.DataFrame({
-        'timestamp': dates,
-        'open': prices,
-        'high': [p + 0.5 for p in prices],
-        'low': [p - 0.5 for p in prices],
-        'close': prices,
-        'volume': [1000] * 50,
-        'vwap': prices,
-        'transactions': [10] * 50
-    })
+    data = np.empty(50, dtype=[('timestamp', 'datetime64[ns]'), ('close', 'f4')])
+    data['timestamp'] = np.arange('2023-01-01', '2023-01-01T04:10', np.timedelta64(5, 'm'), dtype='datetime64[ns]')
+    data['close'] = prices
     
-    return df
+    return data
 
 def test_signal_persistence():
     """Test that signals persist when no crossover occurs."""
+    import pandas as pd
+    from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
+    
     print("🧪 Testing Signal Persistence")
     print("=" * 50)
     
@@ -57,7 +45,7 @@ def test_signal_persistence():
     algo = SmaEmaCrossoverAlgo()
     
     # Create test data
-    df = create_test_data()
+    df = pd.DataFrame.from_records(create_test_data())
     
     # Add indicators
     df = algo.add_technical_indicators(df)
@@ -65,32 +53,45 @@ def test_signal_persistence():
     print(f"📊 Created test data with {len(df)} points")
     print(f"📈 EMA and SMA calculated")
     
-    # Test signal detection at different points
+    # Feed bars in order through the incremental detector, reporting at a few points
     test_points = [25, 30, 35, 42, 45, 48]
+    report_points = set(test_points)
+    
+    # Pull the columns out once so the loop indexes plain arrays instead of pandas rows
+    ema = df['ema_9'].to_numpy()
+    sma = df['sma_21'].to_numpy()
+    close = df['close'].to_numpy()
+    ts = df['timestamp'].to_numpy()
+    above = ema > sma
     
-    for point in test_points:
-        # Get subset of data up to this point
-        subset_df = df.iloc[:point+1].copy()
+    for point in range(1, test_points[-1] + 1):
+        # Detect signal from the two adjacent bars only
+        signal = algo.detect_crossover_last(
+            float(ema[point - 1]), float(sma[point - 1]),
+            float(ema[point]), float(sma[point]),
+            float(close[point]), ts[point]
+        )
         
-        # Detect signal
-        signal = algo.detect_crossover(subset_df)
+        if point not in report_points:
+            continue
         
-        latest = subset_df.iloc[-1]
-        ema_above_sma = latest['ema_9'] > latest['sma_21']
+        ema_above_sma = bool(above[point])
         
-        print(f"\n📍 Point {point}:")
-        print(f"  Signal: {signal['signal']}")
-        print(f"  Reason: {signal['reason']}")
-        print(f"  EMA: ${signal.get('ema', 0):.2f}")
-        print(f"  SMA: ${signal.get('sma', 0):.2f}")
-        print(f"  EMA > SMA: {ema_above_sma}")
-        print(f"  Current algo signal state: {algo.current_signal}")
+        print(
+            f"\n📍 Point {point}:\n"
+            f"  Signal: {signal['signal']}\n"
+            f"  Reason: {signal['reason']}\n"
+            f"  EMA: ${signal.get('ema', 0):.2f}\n"
+            f"  SMA: ${signal.get('sma', 0):.2f}\n"
+            f"  EMA > SMA: {ema_above_sma}\n"
+            f"  Current algo signal state: {algo.current_signal}"
+        )
     
     print(f"\n✅ Final signal state: {algo.current_signal}")
     print("\n🎯 Key behaviors demonstrated:")
     print("- Signals change only on actual crossovers")
     print("- Last signal is maintained when no crossover occurs")
-    print("- Algorithm looks back to find historical crossovers if needed")
+    print("- Crossovers are detected incrementally from adjacent bars")
 
 if __name__ == "__main__":
     test_signal_persistence()
@@ -2,7 +2,7 @@
 def test_get_signal():
     """Test the get_signal method of SmaEmaCrossoverAlgo"""
     from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
-    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgo as SmaEmaCrossoverAlgoAgg
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
 
     algo = SmaEmaCrossoverAlgo()
     algo_agg = SmaEmaCrossoverAlgoAgg()
@@ -14,6 +14,212 @@ def test_get_signal():
     print(f"Initial signal: {signal}")
     print(f"Initial signal (agg): {signal_agg}")
 
+def test_indicator_math():
+    """Test SMA/EMA calculations of SmaEmaCrossoverAlgoAgg on close arrays, without calling Polygon"""
+    import numpy as np
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
+
+    algo = SmaEmaCrossoverAlgoAgg(api_key='test')  # No request is made
+    closes = np.linspace(130.0, 100.0, 21)  # Most recent first
+
+    assert abs(algo.get_sma(closes) - closes.mean()) < 1e-9
+
+    alpha = 2.0 / (algo.ema_period + 1)
+    expected_ema = closes[algo.ema_period - 1]
+    for price in closes[algo.ema_period - 2::-1]:
+        expected_ema = alpha * price + (1 - alpha) * expected_ema
+    assert abs(algo.get_ema(closes) - expected_ema) < 1e-9
+
+    # Fewer closes than the EMA period falls back to a simple average
+    assert abs(algo.get_ema(closes[:3]) - closes[:3].mean()) < 1e-9
+
+    oldest_first = closes[::-1]
+    series = algo.get_sma_series(oldest_first, 5)
+    assert len(series) == len(closes) - 4
+    assert abs(series[-1] - oldest_first[-5:].mean()) < 1e-9
+    print(f"SMA: {algo.get_sma(closes):.4f}, EMA: {algo.get_ema(closes):.4f}")
+
+class _FakeAggClient:
+    """Stands in for the Polygon client, serving 5-minute bars most recent first"""
+
+    def __init__(self, closes):
+        self.closes = list(closes)  # Oldest first; the last bar is still forming
+        self.calls = 0
+
+    def list_aggs(self, symbol, multiplier, timespan, start, end, **kwargs):
+        from types import SimpleNamespace
+        self.calls += 1
+        step = multiplier * 60000
+        return iter([SimpleNamespace(timestamp=i * step, close=c) for i, c in enumerate(self.closes)][::-1])
+
+def test_update_indicators():
+    """Test that incremental SMA/EMA updates match a fresh batch computation, without calling Polygon"""
+    import numpy as np
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
+
+    rng = np.random.default_rng(0)
+    client = _FakeAggClient(100 + np.cumsum(rng.normal(0, 1, 30)))
+    algo = SmaEmaCrossoverAlgoAgg(api_key='test')
+    algo.client = client
+
+    def check(**kwargs):
+        batch = SmaEmaCrossoverAlgoAgg(api_key='test')
+        batch.client = client
+        expected = batch.get_current_indicators('SPY', **kwargs)
+        actual = algo.get_current_indicators('SPY', **kwargs)
+        assert actual['timestamp'] == expected['timestamp']
+        assert abs(actual['sma'] - expected['sma']) < 1e-9
+        assert abs(actual['ema'] - expected['ema']) < 1e-9
+
+    check()  # Seeds the cached window
+    key = ('SPY', 5, 21)
+
+    client.closes[-1] += 0.75  # Same bar still forming
+    assert algo._update_indicators(key, algo._fetch_aggs('SPY', 5, 2)) is not None
+    check()
+
+    client.closes[-1] -= 0.5  # Forming bar settles and one new bar starts
+    client.closes.append(client.closes[-1] + 1.25)
+    assert algo._update_indicators(key, algo._fetch_aggs('SPY', 5, 2)) is not None
+    check()
+
+    client.closes += [101.0, 99.5, 102.0]  # Missed bars - falls back to the batch path
+    assert algo._update_indicators(key, algo._fetch_aggs('SPY', 5, 2)) is None
+    check()
+
+    # Another window or bar size gets its own cached window instead of rolling the default one
+    check(limit=50)
+    check(multiplier=1)
+    client.closes[-1] += 0.25
+    check(limit=50)
+    check()
+
+class _FakeIndicatorClient:
+    """Stands in for the Polygon indicator endpoints, serving one value per minute most recent first"""
+
+    def __init__(self, now):
+        self.now = now  # Minute of the bar that is still forming
+        self.revision = 0  # Bumped to revise the forming bar's value
+        self.calls = []
+
+    def _values(self, kind, limit, timestamp_gte=None, **kwargs):
+        from types import SimpleNamespace
+        self.calls.append((kind, limit, timestamp_gte))
+        minutes = [t for t in range(self.now, -1, -1) if timestamp_gte is None or t * 60000 >= timestamp_gte][:limit]
+        offset = 0.0 if kind == 'sma' else 0.5
+        return SimpleNamespace(values=[
+            SimpleNamespace(timestamp=t * 60000, value=100.0 + offset + 0.1 * t + (0.01 * self.revision if t == self.now else 0.0))
+            for t in minutes])
+
+    def get_sma(self, **kwargs):
+        return self._values('sma', **kwargs)
+
+    def get_ema(self, **kwargs):
+        return self._values('ema', **kwargs)
+
+def test_rolling_indicator_mean():
+    """Test that the rolling indicator window matches a full refetch and only asks for new values"""
+    from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
+
+    client = _FakeIndicatorClient(now=100)
+    algo = SmaEmaCrossoverAlgo(api_key='test')
+    algo.client = client
+
+    for step in [0, 0, 1, 3, 0, 25, 2]:
+        client.now += step
+        client.revision += 1
+        for kind, limit in (('sma', 21), ('ema', 9)):
+            actual = algo._rolling_indicator_mean(kind, 'SPY', 5, limit)
+            fresh = SmaEmaCrossoverAlgo(api_key='test')
+            fresh.client = client
+            expected = fresh._rolling_indicator_mean(kind, 'SPY', 5, limit)
+            assert abs(actual[0] - expected[0]) < 1e-9
+            assert actual[1:] == expected[1:] == (client.now * 60000, limit)
+
+    # Once the window is full only values from the newest cached bar on are requested
+    client.now += 1
+    algo._rolling_indicator_mean('sma', 'SPY', 5, 21)
+    assert client.calls[-1][2] == (client.now - 1) * 60000
+
+def test_get_signal_failure_is_per_symbol():
+    """Test that a failed fetch reports NONE instead of another symbol's signal"""
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
+
+    class _FlakyClient(_FakeAggClient):
+        def list_aggs(self, symbol, *args, **kwargs):
+            if symbol == 'BAD':
+                raise ConnectionError("boom")
+            return super().list_aggs(symbol, *args, **kwargs)
+
+    algo = SmaEmaCrossoverAlgoAgg(api_key='test')
+    algo.client = _FlakyClient([100.0 + i for i in range(30)])
+
+    assert algo.get_signal('SPY')['signal'] == 'BUY'
+    assert algo.get_signal('BAD')['signal'] == 'NONE'
+    signals = algo.get_signals_bulk(['SPY', 'BAD'])
+    assert signals['BAD']['signal'] == 'NONE'
+
+def test_detect_crossover_last():
+    """Test crossover detection from two adjacent samples, without calling Polygon"""
+    from sma_ema_crossover_algo import SmaEmaCrossoverAlgo
+
+    algo = SmaEmaCrossoverAlgo(api_key='test')  # No request is made
+
+    # No crossover before any signal
+    hold = algo.detect_crossover_last(99.0, 100.0, 99.5, 100.0, 100.2, 1)
+    assert hold['signal'] == 'NONE' and hold['crossover_type'] is None
+    assert not hold['ema_above_sma']
+
+    up = algo.detect_crossover_last(99.5, 100.0, 100.5, 100.0, 101.0, 2)
+    assert up['signal'] == 'BUY' and up['crossover_type'] == 'bullish'
+    assert up['ema_above_sma'] and up['price'] == 101.0 and up['timestamp'] == 2
+
+    # Staying above keeps the last signal
+    hold = algo.detect_crossover_last(100.5, 100.0, 101.0, 100.2, 101.5, 3)
+    assert hold['signal'] == 'BUY' and hold['crossover_type'] is None
+
+    down = algo.detect_crossover_last(101.0, 100.2, 100.0, 100.3, 99.0, 4)
+    assert down['signal'] == 'SELL' and down['crossover_type'] == 'bearish'
+    assert not down['ema_above_sma'] and down['ema'] == 100.0 and down['sma'] == 100.3
+
+def test_get_signal_from_df():
+    """Test that SmaEmaCrossoverAlgoAgg derives signals from a DataFrame of aggregates without calling Polygon"""
+    import numpy as np
+    import pandas as pd
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
+
+    algo = SmaEmaCrossoverAlgoAgg(api_key='test')  # No request is made
+    timestamps = pd.date_range('2023-01-01', periods=30, freq='5min')
+    rising = pd.DataFrame({'timestamp': timestamps, 'close': np.linspace(100.0, 130.0, 30)})
+    falling = pd.DataFrame({'timestamp': timestamps, 'close': np.linspace(130.0, 100.0, 30)})
+
+    signal = algo.get_signal_from_df(rising)
+    assert signal['signal'] == 'BUY'
+    assert signal['timestamp'] == timestamps[-1]
+    assert abs(signal['sma'] - rising['close'].iloc[-algo.sma_period:].mean()) < 1e-9
+
+    assert algo.get_signal_from_df(falling)['signal'] == 'SELL'
+    assert algo.current_signal == 'SELL'
+    print(f"Signal from DataFrame: {signal}")
+
+def test_simulate():
+    """Test that the vectorised replay gives the same signal per bar as the batch indicators"""
+    import numpy as np
+    import pandas as pd
+    from sma_ema_crossover_algo_agg import SmaEmaCrossoverAlgoAgg
+
+    algo = SmaEmaCrossoverAlgoAgg(api_key='test')  # No request is made
+    closes = np.concatenate([np.linspace(100.0, 90.0, 30), np.linspace(90.0, 120.0, 30)])
+    signals = algo.simulate(closes)
+
+    assert signals.dtype == np.int8
+    assert not signals[:algo.sma_period - 1].any()
+    for i in range(algo.sma_period - 1, len(closes)):
+        df = pd.DataFrame({'timestamp': np.arange(i + 1), 'close': closes[:i + 1]})
+        expected = algo.get_signal_from_df(df)['signal']
+        assert signals[i] == (1 if expected == 'BUY' else -1)
+    print(f"Simulated signals: {signals}")
+
 if __name__ == "__main__":
     # Import pandas here to avoid import issues
     test_get_signal()